@@ -8,5 +8,14 @@ FPL_PASSWORD = os.getenv("FPL_PASSWORD")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 CLAUDE_API_KEY = os.getenv("CLAUDE_API_KEY")
 TEAM_ID = "6638986"
+# Record/replay FPL API traffic (see http_cassette.py). Leave FPL_HTTP_CASSETTE unset for live runs.
+HTTP_CASSETTE = os.getenv("FPL_HTTP_CASSETTE")
+HTTP_CASSETTE_MODE = os.getenv("FPL_HTTP_CASSETTE_MODE", "replay")  # Options: "record", "replay"
+HTTP_CASSETTE_LATENCY = os.getenv("FPL_HTTP_CASSETTE_LATENCY") or "0"  # Seconds added to each replayed response, or "recorded"
+if HTTP_CASSETTE and HTTP_CASSETTE_LATENCY != "recorded":
+    try:
+        HTTP_CASSETTE_LATENCY = float(HTTP_CASSETTE_LATENCY)
+    except ValueError:
+        raise ValueError(f"FPL_HTTP_CASSETTE_LATENCY must be a number of seconds or 'recorded', got '{HTTP_CASSETTE_LATENCY}'") from None
 USER_MODE = "suggest"  # Options: "suggest", "hybrid", "auto"
 LLM_PROVIDER = "claude"  # Options: "gemini", "claude"
\ No newline at end of file
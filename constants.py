@@ -33,3 +33,15 @@ MYTEAM_FORMAT = "{}{}"
 
 MIN_GAMEWEEK = 1
 MAX_GAMEWEEK = 47
+
+
+# Fields kept from bootstrap-static when it is parsed with projection.
+# Everything else (and every other top-level key) is dropped.
+BOOTSTRAP_FIELDS = {
+    "elements": ("id", "web_name", "first_name", "second_name", "team",
+                 "element_type", "now_cost", "form", "total_points",
+                 "status", "chance_of_playing_next_round", "news"),
+    "teams": ("id", "name", "short_name"),
+    "events": ("id", "deadline_time", "finished", "is_previous",
+               "is_current", "is_next")
+}
@@ -1,5 +1,16 @@
 # data_processor.py
+import bisect
 import json
+import unicodedata
+
+POSITION_MAP = {1: "GKP", 2: "DEF", 3: "MID", 4: "FWD"}
+
+# Largest edit distance accepted when a name has no exact match in the index
+NAME_MAX_EDIT_DISTANCE = 2
+
+MAX_PLAYERS_PER_CLUB = 3
+# How many of the best players up to each price are precomputed in the replacement index
+REPLACEMENT_INDEX_DEPTH = 40
 
 def get_team_name_map(bootstrap_data):
     """Creates a mapping from team ID to team short name (e.g., 1 -> ARS)."""
@@ -25,6 +36,10 @@ def get_my_team_details(my_team_data, player_name_map):
         "value": team_value
     }
 
+def _is_unavailable(player):
+    """True for players ruled out by injury, suspension or leaving the club."""
+    return player.get('status') in ['i', 's', 'u'] and player.get('chance_of_playing_next_round', 100) == 0
+
 def process_players_of_interest(bootstrap_data, team_name_map):
     """
     Selects and simplifies data for the top players based on form and points.
@@ -39,7 +54,7 @@ def process_players_of_interest(bootstrap_data, team_name_map):
     # We'll select the top 50 players to keep the prompt focused
     for player in sorted_players[:50]:
         # Skip players with major injuries or suspensions
-        if player.get('status') in ['i', 's', 'u'] and player.get('chance_of_playing_next_round', 100) == 0:
+        if _is_unavailable(player):
             continue
             
         players_of_interest.append({
@@ -86,9 +101,253 @@ def process_fixture_difficulty(bootstrap_data, fixtures_data, team_name_map):
             
     return fixture_difficulty_summary
 
-def get_player_id_map(bootstrap_data):
-    """Creates a mapping from player web name to player ID (e.g., Salah -> 233)."""
-    return {player['web_name']: player['id'] for player in bootstrap_data['elements']}
+def _normalize_name(name):
+    """Lowercases a name and strips accents and punctuation (e.g. 'M.Ødegaard' -> 'm odegaard')."""
+    decomposed = unicodedata.normalize('NFKD', name or '')
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    # Characters NFKD does not decompose
+    stripped = stripped.replace('ø', 'o').replace('Ø', 'O').replace('ß', 'ss').replace('ł', 'l')
+    cleaned = ''.join(c if c.isalnum() else ' ' for c in stripped.lower())
+    return ' '.join(cleaned.split())
+
+def _deletes(key, max_distance):
+    """All strings reachable from key by removing up to max_distance characters."""
+    results = {key}
+    frontier = {key}
+    for _ in range(max_distance):
+        frontier = {word[:i] + word[i + 1:] for word in frontier for i in range(len(word))}
+        results |= frontier
+    return results
+
+def _edit_distance(a, b, max_distance):
+    """Edit distance between a and b counting adjacent swaps as one edit, capped at max_distance + 1."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    before_previous = None
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+            if i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                cost = min(cost, before_previous[j - 2] + 1)
+            current.append(cost)
+        if min(current) > max_distance and min(previous) > max_distance:
+            return max_distance + 1
+        before_previous, previous = previous, current
+    return min(previous[-1], max_distance + 1)
+
+def build_player_name_index(bootstrap_data, team_name_map=None, max_distance=NAME_MAX_EDIT_DISTANCE):
+    """
+    Builds a normalized lookup index over every player's web, full, first and second names.
+    Each key maps to (player_id, rank) entries, where a lower rank is a stronger match
+    (web name, then full name, then surname, then first name).
+    """
+    team_name_map = team_name_map or get_team_name_map(bootstrap_data)
+    players = {}
+    keys = {}
+
+    for player in bootstrap_data['elements']:
+        player_id = player['id']
+        players[player_id] = {
+            "web_name": player['web_name'],
+            "team": team_name_map.get(player['team'], 'N/A'),
+            "team_id": player['team'],
+            "position": POSITION_MAP.get(player['element_type']),
+            "now_cost": player['now_cost']
+        }
+
+        web_name = _normalize_name(player['web_name'])
+        first_name = _normalize_name(player.get('first_name'))
+        second_name = _normalize_name(player.get('second_name'))
+        candidates = [(web_name, 0), (f"{first_name} {second_name}".strip(), 1), (second_name, 2), (first_name, 3)]
+        # 'M.Salah' style web names are also reachable by their last token
+        if ' ' in web_name:
+            candidates.append((web_name.split()[-1], 2))
+        if first_name and second_name:
+            candidates.append((f"{first_name[0]} {second_name}", 1))
+            # 'Gabriel Jesus' for 'Gabriel Fernando de Jesus'
+            candidates.append((f"{first_name} {second_name.split()[-1]}", 1))
+            # 'Bruno Fernandes' for 'Bruno Borges Fernandes'
+            candidates.append((f"{first_name.split()[0]} {second_name.split()[-1]}", 1))
+
+        for key, rank in candidates:
+            if not key:
+                continue
+            entries = keys.setdefault(key, {})
+            entries[player_id] = min(rank, entries.get(player_id, rank))
+
+    deletes = {}
+    for key in keys:
+        for variant in _deletes(key, max_distance):
+            deletes.setdefault(variant, set()).add(key)
+
+    return {"players": players, "keys": keys, "deletes": deletes, "max_distance": max_distance}
+
+def _lookup_name_key(name_index, key, allowed):
+    """Returns {player_id: rank} for the allowed players under the closest indexed key(s) to key."""
+    exact = {pid: rank for pid, rank in name_index['keys'].get(key, {}).items() if allowed(pid)}
+    if exact:
+        return exact
+
+    # Short names get a tighter bound so 'Son' cannot drift to an unrelated three-letter name
+    max_distance = min(name_index['max_distance'], len(key) // 3)
+    nearby = set()
+    for variant in _deletes(key, max_distance):
+        nearby |= name_index['deletes'].get(variant, set())
+
+    best_distance = max_distance + 1
+    matches = {}
+    for candidate in nearby:
+        distance = _edit_distance(key, candidate, max_distance)
+        if distance > min(best_distance, max_distance):
+            continue
+        entries = {pid: rank for pid, rank in name_index['keys'][candidate].items() if allowed(pid)}
+        if not entries:
+            continue
+        if distance < best_distance:
+            best_distance, matches = distance, {}
+        for player_id, rank in entries.items():
+            matches[player_id] = min(rank, matches.get(player_id, rank))
+    return matches
+
+def resolve_player_name(name_index, name, position=None, team=None, candidate_ids=None, exclude_ids=None):
+    """
+    Resolves a free-text player name to a player ID, or None if it is unknown or ambiguous.
+    candidate_ids/exclude_ids and position ('GKP'/'DEF'/'MID'/'FWD') restrict the search,
+    while team (short name or ID) only breaks ties between namesakes.
+    """
+    players = name_index['players']
+
+    def allowed(pid):
+        if candidate_ids is not None and pid not in candidate_ids:
+            return False
+        if exclude_ids and pid in exclude_ids:
+            return False
+        return not position or players[pid]['position'] == position
+
+    matches = _lookup_name_key(name_index, _normalize_name(name), allowed)
+
+    if team is not None:
+        narrowed = {pid: rank for pid, rank in matches.items() if team in (players[pid]['team'], players[pid]['team_id'])}
+        # A team that rules out every match is more likely wrong than the name itself
+        if narrowed:
+            matches = narrowed
+
+    if not matches:
+        return None
+    best_rank = min(matches.values())
+    best = [pid for pid, rank in matches.items() if rank == best_rank]
+    return best[0] if len(best) == 1 else None
+
+def resolve_player_names(name_index, names, **filters):
+    """Resolves a batch of names with the same filters, returning {name: player_id or None}."""
+    return {name: resolve_player_name(name_index, name, **filters) for name in names}
+
+def build_replacement_index(bootstrap_data, team_name_map=None, depth=REPLACEMENT_INDEX_DEPTH):
+    """
+    Builds, for each position, the distinct prices in ascending order and, for every price,
+    the best `depth` players costing at most that much (by form, then total points).
+    A budget query is then a bisect plus a walk down one precomputed list.
+    """
+    team_name_map = team_name_map or get_team_name_map(bootstrap_data)
+    players = {}
+    by_position = {position: {} for position in POSITION_MAP.values()}
+
+    for player in bootstrap_data['elements']:
+        position = POSITION_MAP.get(player['element_type'])
+        players[player['id']] = {
+            "name": player['web_name'],
+            "team": team_name_map.get(player['team'], 'N/A'),
+            "team_id": player['team'],
+            "position": position,
+            "price": player['now_cost'],
+            "form": float(player['form']),
+            "points": player['total_points']
+        }
+        if position and not _is_unavailable(player):
+            score = (-float(player['form']), -player['total_points'], player['id'])
+            by_position[position].setdefault(player['now_cost'], []).append(score)
+
+    positions = {}
+    for position, bands in by_position.items():
+        prices = sorted(bands)
+        prefix_best = []
+        best = []
+        for price in prices:
+            # Scores sort best-first, so the cheaper prefix plus this band truncates to the new prefix
+            best = sorted(best + bands[price])[:depth]
+            prefix_best.append([player_id for _, _, player_id in best])
+        positions[position] = {"prices": prices, "prefix_best": prefix_best, "bands": bands}
+
+    return {"players": players, "positions": positions, "depth": depth}
+
+def find_replacements(replacement_index, player_out_id, budget, squad_ids, club_counts, k=5):
+    """
+    Returns up to k same-position players costing at most `budget` (in tenths of £m) who are
+    not already in the squad and would not break the per-club limit once player_out_id leaves.
+    """
+    players = replacement_index['players']
+    player_out = players.get(player_out_id)
+    if not player_out:
+        return []
+    positions = replacement_index['positions'][player_out['position']]
+    cutoff = bisect.bisect_right(positions['prices'], budget)
+    if not cutoff:
+        return []
+
+    def allowed(player_id):
+        player = players[player_id]
+        if player_id in squad_ids:
+            return False
+        club_count = club_counts.get(player['team_id'], 0) - (player['team_id'] == player_out['team_id'])
+        return club_count < MAX_PLAYERS_PER_CLUB
+
+    replacements = [pid for pid in positions['prefix_best'][cutoff - 1] if allowed(pid)][:k]
+    if len(replacements) < k and len(positions['prefix_best'][cutoff - 1]) == replacement_index['depth']:
+        # Exclusions used up the precomputed list, so fall back to every affordable band
+        affordable = sorted(score for price in positions['prices'][:cutoff] for score in positions['bands'][price])
+        replacements = [pid for _, _, pid in affordable if allowed(pid)][:k]
+
+    return [{
+        "id": pid,
+        "name": players[pid]['name'],
+        "team": players[pid]['team'],
+        "price": players[pid]['price'] / 10.0,
+        "form": players[pid]['form'],
+        "points": players[pid]['points']
+    } for pid in replacements]
+
+def find_squad_replacements(replacement_index, my_team_data, k=5):
+    """Finds the top-k affordable replacements for every player in the squad, keyed by player ID."""
+    players = replacement_index['players']
+    bank = my_team_data['transfers']['bank'] if my_team_data.get('transfers') else 0
+    squad_ids = {pick['element'] for pick in my_team_data['picks']}
+
+    club_counts = {}
+    for player_id in squad_ids:
+        if player_id in players:
+            team_id = players[player_id]['team_id']
+            club_counts[team_id] = club_counts.get(team_id, 0) + 1
+
+    replacements = {}
+    for pick in my_team_data['picks']:
+        player = players.get(pick['element'])
+        if not player:
+            continue
+        budget = pick.get('selling_price', player['price']) + bank
+        replacements[pick['element']] = find_replacements(replacement_index, pick['element'], budget, squad_ids, club_counts, k)
+    return replacements
+
+def format_squad_replacements(replacement_index, squad_replacements):
+    """Formats replacement options as one line per squad player for the prompt."""
+    players = replacement_index['players']
+    lines = []
+    for player_id, replacements in squad_replacements.items():
+        player = players[player_id]
+        options = ", ".join(f"{r['name']} (£{r['price']}m, {r['team']}, form {r['form']})" for r in replacements)
+        lines.append(f"- {player['name']} ({player['team']}): {options or 'No affordable replacement'}")
+    return "\n".join(lines)
 
 def get_player_selling_price_map(my_team_data):
     """Creates a mapping of player IDs in your team to their current selling price."""
@@ -98,7 +357,6 @@ def get_squad_by_position(my_team_data, bootstrap_data, team_name_map):
     """Creates formatted strings of players in the squad, broken down by position."""
     
     player_details_map = {p['id']: p for p in bootstrap_data['elements']}
-    position_map = {1: "GKP", 2: "DEF", 3: "MID", 4: "FWD"}
     
     squad_by_pos = {"GKP": [], "DEF": [], "MID": [], "FWD": []}
 
@@ -108,7 +366,7 @@ def get_squad_by_position(my_team_data, bootstrap_data, team_name_map):
         if not player_detail:
             continue
             
-        position = position_map.get(player_detail['element_type'])
+        position = POSITION_MAP.get(player_detail['element_type'])
         team_name = team_name_map.get(player_detail['team'])
         price = player_detail['now_cost'] / 10.0
         player_name = player_detail['web_name']
@@ -1,15 +1,31 @@
 import requests
 import config
 import constants  
+import http_cassette
+
+# ijson lets bootstrap-static be projected while it streams in
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
 
 # Define headers once to be used in all requests
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 }
 
+def _new_session():
+    """Creates a requests session, routed through the configured cassette if there is one."""
+    session = requests.Session()
+    if config.HTTP_CASSETTE:
+        http_cassette.install(session, config.HTTP_CASSETTE, mode=config.HTTP_CASSETTE_MODE,
+                              latency=config.HTTP_CASSETTE_LATENCY or None)
+    return session
+
 def login_and_get_session():
     """Logs into FPL and returns an authenticated session object."""
-    session = requests.Session()
+    session = _new_session()
     login_url = "https://users.premierleague.com/accounts/login/"
 
     payload = {
@@ -39,7 +55,7 @@ def get_me(session):
 def get_my_team(session):
     """Fetches the user's current team using an authenticated session."""
     # Get bootstrap data to find current gameweek
-    bootstrap_data = get_bootstrap_data()
+    bootstrap_data = get_bootstrap_data(projected=True)
     current_gameweek = next((event['id'] for event in bootstrap_data['events'] if event['is_current']), 1)
     
     # Use the picks endpoint instead of my-team which returns 403
@@ -73,12 +89,113 @@ def get_my_team(session):
     
     return transformed_data
 
-def get_bootstrap_data():
-    """Fetches the main bootstrap-static data (all players, teams, etc.)."""
+def get_bootstrap_data(projected=False, stream=False):
+    """
+    Fetches the main bootstrap-static data (all players, teams, etc.).
+    With projected=True only the fields in constants.BOOTSTRAP_FIELDS are kept, each item
+    as a compact read-only record, so far less of the response stays in memory.
+    stream=True additionally parses the response incrementally with ijson, which lowers
+    peak memory but takes roughly twice as long as a plain parse; without ijson it falls
+    back to the plain parse.
+    """
     url = constants.API_URLS["static"] 
-    response = requests.get(url, headers=HEADERS)
+    if not projected:
+        response = _new_session().get(url, headers=HEADERS)
+        response.raise_for_status()
+        return response.json()
+
+    stream = stream and IJSON_AVAILABLE
+    response = _new_session().get(url, headers=HEADERS, stream=stream)
     response.raise_for_status()
-    return response.json()
+    if not stream:
+        return project_bootstrap(response.json())
+
+    response.raw.decode_content = True
+    try:
+        return _stream_projected(response.raw, constants.BOOTSTRAP_FIELDS)
+    finally:
+        response.close()
+
+class BootstrapRecord:
+    """
+    A slotted, dict-like view of one projected bootstrap item (player, team or gameweek).
+    Supports item['field'], item.get('field') and 'field' in item like the parsed JSON dicts.
+    """
+    __slots__ = ()
+    _fields = frozenset()
+
+    def __getitem__(self, name):
+        if name in self._fields:
+            try:
+                return getattr(self, name)
+            except AttributeError:
+                pass
+        raise KeyError(name)
+
+    def get(self, name, default=None):
+        return getattr(self, name, default) if name in self._fields else default
+
+    def __contains__(self, name):
+        return name in self._fields and hasattr(self, name)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__ if hasattr(self, name)}
+
+    def __eq__(self, other):
+        if isinstance(other, BootstrapRecord):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()})"
+
+_RECORD_TYPES = {}
+
+def _record_type(section, names):
+    """Returns the BootstrapRecord subclass for a section's projected fields, creating it once."""
+    key = (section, tuple(names))
+    if key not in _RECORD_TYPES:
+        class_name = f"{section.title()}Record"
+        _RECORD_TYPES[key] = type(class_name, (BootstrapRecord,), {"__slots__": tuple(names), "_fields": frozenset(names)})
+    return _RECORD_TYPES[key]
+
+def _make_record(record_type, values):
+    record = record_type()
+    for name, value in values.items():
+        setattr(record, name, value)
+    return record
+
+def project_bootstrap(bootstrap_data, fields=constants.BOOTSTRAP_FIELDS):
+    """Reduces already-parsed bootstrap data to the projected sections and fields."""
+    projected = {}
+    for section, names in fields.items():
+        record_type = _record_type(section, names)
+        projected[section] = [_make_record(record_type, {name: item[name] for name in names if name in item})
+                              for item in bootstrap_data.get(section, [])]
+    return projected
+
+def _stream_projected(stream, fields):
+    """Builds the projected bootstrap dict from ijson parse events, one item at a time."""
+    projected = {section: [] for section in fields}
+    item_prefixes = {f"{section}.item": section for section in fields}
+    record_types = {section: _record_type(section, names) for section, names in fields.items()}
+    wanted = {f"{section}.item.{name}": name
+              for section, names in fields.items() for name in names}
+    scalar_events = ('null', 'boolean', 'integer', 'double', 'number', 'string')
+
+    current = None
+    for prefix, event, value in ijson.parse(stream, use_float=True):
+        if prefix in item_prefixes:
+            if event == 'start_map':
+                current = {}
+            elif event == 'end_map':
+                section = item_prefixes[prefix]
+                projected[section].append(_make_record(record_types[section], current))
+                current = None
+        elif current is not None and event in scalar_events and prefix in wanted:
+            current[wanted[prefix]] = value
+
+    return projected
 
 def make_transfers(session, payload):
     """Submits the transfer payload to the FPL API."""
@@ -105,7 +222,7 @@ def make_transfers(session, payload):
 def get_fixtures_data():
     """Fetches the full list of fixtures for the season."""
     url = constants.API_URLS["fixtures"] 
-    response = requests.get(url, headers=HEADERS)
+    response = _new_session().get(url, headers=HEADERS)
     response.raise_for_status()
     return response.json()
 
@@ -22,34 +22,82 @@ def _send_approval_email(ai_response, config):
     except Exception as e:
         print(f"❌ Failed to send email: {e}")
 
-def _prepare_transfer_payload(transfers_to_make, team_id, gameweek, player_id_map, selling_price_map, bootstrap_data):
-    """Constructs the JSON payload required by the FPL transfers API."""
+def _reject_transfers(reason):
+    """Logs why the whole set of transfers was rejected; always returns None."""
+    message = f"TRANSFERS REJECTED: {reason}"
+    print(f"⚠️ Warning: {message}")
+    logger.log_action(message)
+    return None
+
+def _prepare_transfer_payload(transfers_to_make, team_id, gameweek, name_index, selling_price_map, bank):
+    """
+    Constructs the JSON payload required by the FPL transfers API.
+    Like FPL itself, the transfers are validated as one set: if any of them cannot be
+    resolved, or budget and club limits fail for the set as a whole, nothing is returned.
+    A player bought and then sold again within the set is collapsed into a single transfer.
+    """
     
     payload_transfers = []
-    all_players = bootstrap_data['elements']
+    players = name_index['players']
+    # The squad as it stands after the transfers processed so far
+    squad_ids = set(selling_price_map)
 
     for transfer in transfers_to_make:
         player_out_name = transfer['player_out']
         player_in_name = transfer['player_in']
+        position = transfer.get('position')
 
-        # Find the IDs and prices needed for the payload
-        player_out_id = player_id_map.get(player_out_name)
-        player_in_id = player_id_map.get(player_in_name)
+        # Outgoing players can only come from the squad, incoming ones only from outside it
+        player_out_id = data_processor.resolve_player_name(name_index, player_out_name, position=position, candidate_ids=squad_ids)
+        player_in_id = data_processor.resolve_player_name(name_index, player_in_name, position=position, exclude_ids=squad_ids)
         
         if not player_out_id or not player_in_id:
-            print(f"⚠️ Warning: Could not find ID for {player_out_name} or {player_in_name}. Skipping transfer.")
-            continue
+            return _reject_transfers(f"Could not find ID for {player_out_name} or {player_in_name}.")
+
+        if players[player_in_id]['position'] != players[player_out_id]['position']:
+            return _reject_transfers(f"{player_out_name} ({players[player_out_id]['position']}) cannot be "
+                                     f"replaced by {player_in_name} ({players[player_in_id]['position']}).")
 
-        selling_price = selling_price_map.get(player_out_id)
-        purchase_price = next((p['now_cost'] for p in all_players if p['id'] == player_in_id), None)
+        squad_ids.discard(player_out_id)
+        squad_ids.add(player_in_id)
+        purchase_price = players[player_in_id]['now_cost']
+
+        # Selling a player bought earlier in the set: FPL only sees the original sale
+        earlier = next((t for t in payload_transfers if t['element_in'] == player_out_id), None)
+        if earlier:
+            if earlier['element_out'] == player_in_id:
+                payload_transfers.remove(earlier)
+            else:
+                earlier['element_in'] = player_in_id
+                earlier['purchase_price'] = purchase_price
+            continue
 
         payload_transfers.append({
             "element_in": player_in_id,
             "element_out": player_out_id,
             "purchase_price": purchase_price,
-            "selling_price": selling_price
+            "selling_price": selling_price_map[player_out_id]
         })
 
+    if not payload_transfers:
+        return _reject_transfers("No transfers are left to make.")
+
+    final_bank = bank + sum(t['selling_price'] - t['purchase_price'] for t in payload_transfers)
+    club_counts = {}
+    for player_id in squad_ids:
+        if player_id in players:
+            team = players[player_id]['team']
+            club_counts[team] = club_counts.get(team, 0) + 1
+    over_limit = [team for team, count in club_counts.items() if count > data_processor.MAX_PLAYERS_PER_CLUB]
+
+    problems = []
+    if final_bank < 0:
+        problems.append(f"they would leave the bank at -£{-final_bank / 10.0}m")
+    if over_limit:
+        problems.append(f"they would exceed {data_processor.MAX_PLAYERS_PER_CLUB} players from {', '.join(sorted(over_limit))}")
+    if problems:
+        return _reject_transfers(f"The {len(payload_transfers)} transfer(s) cannot be made together because {' and '.join(problems)}.")
+
     return {
         "confirmed": False,
         "entry": int(team_id),
@@ -61,6 +109,9 @@ def _prepare_transfer_payload(transfers_to_make, team_id, gameweek, player_id_ma
 
 def execute_transfers(session, payload):
     """⚠️ DANGEROUS! This function executes transfers on your FPL team."""
+    if not payload or not payload['transfers']:
+        print("No valid transfer payload. Nothing was executed.")
+        return
     print("Executing transfers...")
     try:
         fpl_api.make_transfers(session, payload)
@@ -114,21 +165,21 @@ def handle_ai_recommendations(session, ai_response, config, bootstrap_data, my_t
         else:
             print("No point hit required. Proceeding with automatic transfer.")
             gameweek = next((event['id'] for event in bootstrap_data['events'] if event['is_next']), None)
-            player_id_map = data_processor.get_player_id_map(bootstrap_data)
+            name_index = data_processor.build_player_name_index(bootstrap_data)
             selling_price_map = data_processor.get_player_selling_price_map(my_team_data)
             
-            payload = _prepare_transfer_payload(transfers, config.TEAM_ID, gameweek, player_id_map, selling_price_map, bootstrap_data)
+            payload = _prepare_transfer_payload(transfers, config.TEAM_ID, gameweek, name_index, selling_price_map, my_team_data['transfers']['bank'])
             execute_transfers(session, payload)
             
-            payload = _prepare_transfer_payload(transfers, config.TEAM_ID, gameweek, player_id_map, selling_price_map, bootstrap_data)
+            payload = _prepare_transfer_payload(transfers, config.TEAM_ID, gameweek, name_index, selling_price_map, my_team_data['transfers']['bank'])
             execute_transfers(session, payload)
             
     elif config.USER_MODE == 'auto':
         print("Operating in 'auto' mode. Proceeding with automatic transfer.")
         # All preparation for making the transfer goes here
         gameweek = next((event['id'] for event in bootstrap_data['events'] if event['is_next']), None)
-        player_id_map = data_processor.get_player_id_map(bootstrap_data)
+        name_index = data_processor.build_player_name_index(bootstrap_data)
         selling_price_map = data_processor.get_player_selling_price_map(my_team_data)
         
-        payload = _prepare_transfer_payload(transfers, config.TEAM_ID, gameweek, player_id_map, selling_price_map, bootstrap_data)
+        payload = _prepare_transfer_payload(transfers, config.TEAM_ID, gameweek, name_index, selling_price_map, my_team_data['transfers']['bank'])
         execute_transfers(session, payload)
\ No newline at end of file
@@ -0,0 +1,305 @@
+# http_cassette.py
+"""
+Record/replay transport for the FPL API.
+
+In 'record' mode real requests go out and each request/response pair is appended
+to a gzip-compressed JSON cassette. In 'replay' mode the same pairs are served
+back without touching the network, either through a requests adapter or through
+a local stub server (python http_cassette.py serve <cassette>).
+
+Request bodies are stored only as a hash and cookie headers are never written,
+so login credentials and session tokens do not end up in cassette files. While
+recording, callers still get the live response, so logins work as usual.
+"""
+import argparse
+import atexit
+import base64
+import gzip
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from requests.adapters import HTTPAdapter
+from urllib3.response import HTTPResponse
+
+MODES = ("record", "replay")
+
+# Headers that are either secrets or describe the wire encoding rather than the stored body
+_DROPPED_HEADERS = {"set-cookie", "cookie", "content-encoding", "transfer-encoding", "content-length", "connection"}
+
+# One Cassette per file, so every session in a run shares the same recording
+_CASSETTES = {}
+_CASSETTES_LOCK = threading.Lock()
+
+class CassetteMiss(Exception):
+    """Raised in replay mode when no recorded interaction matches a request."""
+
+def _body_hash(body):
+    if not body:
+        return None
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    return hashlib.sha256(body).hexdigest()
+
+def _fuzzy_key(method, url):
+    """Method plus path and sorted query, ignoring host, scheme and trailing slashes."""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return f"{method.upper()} {parts.path.rstrip('/')}?{query}"
+
+class Cassette:
+    """An ordered list of recorded interactions stored in a .json.gz file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.interactions = []
+        self._lock = threading.Lock()
+        self._exact = {}
+        self._fuzzy = {}
+        self._served = {}
+        self._dirty = False
+        if os.path.exists(path):
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for interaction in json.load(f)['interactions']:
+                    self._add(interaction)
+
+    def _add(self, interaction):
+        request = interaction['request']
+        position = len(self.interactions)
+        self.interactions.append(interaction)
+        exact_key = (request['method'], request['url'], request['body_hash'])
+        self._exact.setdefault(exact_key, []).append(position)
+        self._fuzzy.setdefault(_fuzzy_key(request['method'], request['url']), []).append(position)
+
+    def record(self, method, url, body, response, elapsed):
+        """Stores one request/response pair; the file is written by save(), at the latest on exit."""
+        interaction = {
+            "request": {"method": method.upper(), "url": url, "body_hash": _body_hash(body)},
+            "response": {
+                "status": response.status_code,
+                "reason": response.reason,
+                "headers": {k: v for k, v in response.headers.items() if k.lower() not in _DROPPED_HEADERS},
+                "body": base64.b64encode(response.content).decode('ascii'),
+                "elapsed": elapsed
+            }
+        }
+        with self._lock:
+            if not self._dirty:
+                atexit.register(self.save)
+            self._add(interaction)
+            self._dirty = True
+        return interaction
+
+    def save(self):
+        """Writes any new interactions to disk, replacing the old file only once the new one is complete."""
+        with self._lock:
+            if not self._dirty:
+                return
+            directory = os.path.dirname(self.path) or "."
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'wb') as raw, gzip.open(raw, 'wt', encoding='utf-8') as f:
+                    json.dump({"interactions": self.interactions}, f)
+                os.replace(temp_path, self.path)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+            atexit.unregister(self.save)
+            self._dirty = False
+
+    def match(self, method, url, body=None, fuzzy=True):
+        """
+        Finds the recorded interaction for a request. Exact matches (method, URL, body)
+        win; with fuzzy=True host, trailing slash and query order are ignored as a fallback.
+        Repeated identical requests are served in recorded order, then the last one repeats.
+        """
+        method = method.upper()
+        candidates = [("exact", (method, url, _body_hash(body)), self._exact)]
+        if fuzzy:
+            candidates.append(("fuzzy", _fuzzy_key(method, url), self._fuzzy))
+
+        with self._lock:
+            for kind, key, table in candidates:
+                positions = table.get(key)
+                if not positions:
+                    continue
+                served = self._served.get((kind, key), 0)
+                self._served[(kind, key)] = served + 1
+                return self.interactions[positions[min(served, len(positions) - 1)]]
+        raise CassetteMiss(f"No recorded interaction for {method} {url} in {self.path}")
+
+def get_cassette(path):
+    """Returns the shared Cassette for a file, loading it on first use."""
+    path = os.path.abspath(path)
+    with _CASSETTES_LOCK:
+        if path not in _CASSETTES:
+            _CASSETTES[path] = Cassette(path)
+        return _CASSETTES[path]
+
+def _sleep_for(interaction, latency):
+    """latency is None (no delay), a fixed number of seconds, or 'recorded'."""
+    if latency == "recorded":
+        time.sleep(interaction['response'].get('elapsed', 0))
+    elif latency:
+        time.sleep(latency)
+
+class CassetteAdapter(HTTPAdapter):
+    """A requests transport adapter that records to or replays from a cassette."""
+
+    def __init__(self, cassette, mode="replay", fuzzy=True, latency=None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode '{mode}'. Options: {', '.join(MODES)}")
+        super().__init__()
+        self.cassette = cassette
+        self.mode = mode
+        self.fuzzy = fuzzy
+        self.latency = latency
+
+    def send(self, request, **kwargs):
+        if self.mode == "record":
+            started = time.monotonic()
+            real_response = super().send(request, **kwargs)
+            content = real_response.content  # Read the whole body so it can be stored
+            self.cassette.record(request.method, request.url, request.body,
+                                 real_response, time.monotonic() - started)
+            # Return the live response, cookies included, with its raw stream re-seated on the
+            # already-decoded body so stream=True callers can still read it
+            original_raw = real_response.raw
+            real_response.raw = HTTPResponse(
+                body=io.BytesIO(content),
+                headers={k: v for k, v in original_raw.headers.items() if k.lower() not in _DROPPED_HEADERS},
+                status=original_raw.status,
+                reason=original_raw.reason,
+                preload_content=False,
+                decode_content=False,
+                original_response=getattr(original_raw, '_original_response', None)
+            )
+            return real_response
+
+        interaction = self.cassette.match(request.method, request.url, request.body, fuzzy=self.fuzzy)
+        _sleep_for(interaction, self.latency)
+        return self._build_replay_response(request, interaction)
+
+    def _build_replay_response(self, request, interaction):
+        recorded = interaction['response']
+        raw = HTTPResponse(
+            body=io.BytesIO(base64.b64decode(recorded['body'])),
+            headers=recorded['headers'],
+            status=recorded['status'],
+            reason=recorded.get('reason'),
+            preload_content=False,
+            decode_content=False
+        )
+        return self.build_response(request, raw)
+
+def install(session, path, mode="replay", fuzzy=True, latency=None):
+    """Routes every http(s) request made through session via the cassette at path."""
+    adapter = CassetteAdapter(get_cassette(path), mode=mode, fuzzy=fuzzy, latency=latency)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def serve(path, host="127.0.0.1", port=8765, latency=None):
+    """Serves a cassette over HTTP. The host is never part of the request, so matching is always fuzzy."""
+    cassette = get_cassette(path)
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def _replay(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length) if length else None
+            try:
+                interaction = cassette.match(self.command, self.path, body, fuzzy=True)
+            except CassetteMiss as e:
+                self.send_error(404, str(e))
+                return
+            _sleep_for(interaction, latency)
+            recorded = interaction['response']
+            payload = base64.b64decode(recorded['body'])
+            self.send_response(recorded['status'], recorded.get('reason'))
+            for name, value in recorded['headers'].items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        do_GET = do_POST = do_PUT = do_DELETE = _replay
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    print(f"Serving {len(cassette.interactions)} recorded interactions from {path} on http://{host}:{port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def run_self_check():
+    """
+    Records a gzip-encoded response from a throwaway local server, then reads it back
+    with stream=True both while recording and on replay, as get_bootstrap_data(stream=True) does.
+    """
+    import requests
+
+    expected = json.dumps({"elements": [{"id": i, "web_name": f"Player {i}"} for i in range(2000)]}).encode()
+    compressed = gzip.compress(expected)
+
+    class GzipHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Encoding', 'gzip')
+            self.send_header('Content-Length', str(len(compressed)))
+            self.end_headers()
+            self.wfile.write(compressed)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), GzipHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/api/bootstrap-static/"
+    path = os.path.join(tempfile.mkdtemp(), "self_check.json.gz")
+
+    passed = True
+    try:
+        for mode in MODES:
+            session = install(requests.Session(), path, mode=mode)
+            try:
+                response = session.get(url, stream=True)
+                response.raw.decode_content = True
+                # Read in chunks like ijson does; a stale Content-Length only shows up this way
+                body = b"".join(iter(lambda: response.raw.read(65536), b""))
+                ok = body == expected
+            except Exception as e:
+                ok, body = False, e
+            print(f"{'✅' if ok else '❌'} {mode} + stream=True: {'body matches' if ok else body}")
+            passed = passed and ok
+            if mode == "record":
+                get_cassette(path).save()
+                server.shutdown()
+    finally:
+        server.server_close()
+    return passed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a recorded FPL API cassette as a local stub server.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve_parser = subparsers.add_parser("serve")
+    serve_parser.add_argument("cassette")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    serve_parser.add_argument("--latency", type=float, default=None, help="Fixed delay per response in seconds")
+    subparsers.add_parser("check", help="Verify record and replay of a streamed gzip response")
+    args = parser.parse_args()
+    if args.command == "check":
+        raise SystemExit(0 if run_self_check() else 1)
+    serve(args.cassette, args.host, args.port, latency=args.latency)
@@ -57,18 +57,12 @@ def main():
         session = fpl_api.login_and_get_session()
         print("Login and session verified!")
         
-        bootstrap_data = fpl_api.get_bootstrap_data()
+        bootstrap_data = fpl_api.get_bootstrap_data(projected=True)
         fixtures_data = fpl_api.get_fixtures_data()
         
-        # --- TEMPORARY PRE-SEASON FIX ---
-        # Comment out the live API call
+        # For offline or pre-season runs, set FPL_HTTP_CASSETTE to a recorded
+        # cassette (see http_cassette.py) and every request is replayed from it.
         my_team_data = fpl_api.get_my_team(session)
-        
-        # Load the local sample file instead
-        #print("   -> NOTE: Using local 'my_team_sample.json' for pre-season testing.")
-        #with open('my_team_sample.json') as f:
-            #my_team_data = json.load(f)
-        # ------------------------------
 
         print("All data fetched successfully.")
     except Exception as e:
@@ -93,6 +87,10 @@ def main():
     squad_breakdown = data_processor.get_squad_by_position(my_team_data, bootstrap_data, team_name_map)
     team_distribution = data_processor.get_team_distribution(my_team_data, bootstrap_data, team_name_map)
     
+    # Like-for-like replacements each squad player could be swapped for right now
+    replacement_index = data_processor.build_replacement_index(bootstrap_data, team_name_map)
+    squad_replacements = data_processor.find_squad_replacements(replacement_index, my_team_data)
+    
     print("Data processed.")
 
     # Build the prompt with all the new placeholders
@@ -112,7 +110,8 @@ def main():
             squad_fwd_string=squad_breakdown['squad_fwd_string'],
             team_distribution_string=team_distribution,
             fixture_difficulty_string=json.dumps(fixture_difficulty, indent=2),
-            players_of_interest_string=json.dumps(players_of_interest, indent=2)
+            players_of_interest_string=json.dumps(players_of_interest, indent=2),
+            replacement_options_string=data_processor.format_squad_replacements(replacement_index, squad_replacements)
         )
     except Exception as e:
         print(f"Error building prompt: {e}")
@@ -0,0 +1,166 @@
+# season_planner.py
+"""
+Season-long chip and free-transfer planning.
+
+The planner runs a dynamic program over (gameweek, banked free transfers, chips left).
+Each gameweek is described by an estimate dictionary supplied by the caller:
+
+    {
+        "base": 52.0,                          # expected points if no transfers are made
+        "transfer_gains": [6.5, 3.0, 1.2],     # marginal gain of the 1st, 2nd, 3rd... transfer
+        "chip_gains": {"bboost": 9.0, "3xc": 7.5, "wildcard": 14.0, "freehit": 11.0}
+    }
+
+Subproblems are memoized, so re-planning after a gameweek only recomputes the
+gameweeks whose estimates changed and everything before them.
+"""
+
+# Chip names as used by the FPL API (e.g. 'active_chip' on the picks endpoint)
+CHIPS = ("wildcard", "freehit", "bboost", "3xc")
+
+# Chips that make every transfer that week free and leave banked transfers untouched
+TRANSFER_CHIPS = ("wildcard", "freehit")
+
+MAX_FREE_TRANSFERS = 5
+TRANSFER_HIT_COST = 4
+
+def _window_end(window):
+    """Sort key putting windows that close earliest first and open-ended ones last."""
+    return float('inf') if window[1] is None else window[1]
+
+class SeasonPlanner:
+    """Plans chip usage and free-transfer banking over the remaining gameweeks."""
+
+    def __init__(self, estimates, max_free_transfers=MAX_FREE_TRANSFERS, hit_cost=TRANSFER_HIT_COST, chip_windows=None):
+        """
+        estimates maps gameweek -> estimate dict (see module docstring).
+        chip_windows optionally maps a chip to the (first_gw, last_gw) it may be played in, or to a
+        list of windows with one per instance (e.g. [(1, 19), (20, 38)] for one wildcard per half).
+        Either end of a window may be None.
+        """
+        self.estimates = dict(estimates)
+        self.max_free_transfers = max_free_transfers
+        self.hit_cost = hit_cost
+        self.chip_windows = {}
+        for chip, windows in (chip_windows or {}).items():
+            # A single window applies to every instance of the chip
+            self.chip_windows[chip] = sorted(windows, key=_window_end) if isinstance(windows, list) else windows
+        self._gameweeks = sorted(self.estimates)
+        self._memo = {}
+
+    def update_estimate(self, gameweek, estimate):
+        """Replaces one gameweek's estimate, dropping only the subproblems that depend on it."""
+        self.estimates[gameweek] = estimate
+        if gameweek not in self._gameweeks:
+            self._gameweeks = sorted(self.estimates)
+            self._memo.clear()
+            return
+        index = self._gameweeks.index(gameweek)
+        self._memo = {key: value for key, value in self._memo.items() if key[0] > index}
+
+    def plan(self, start_gameweek, free_transfers, chips_available):
+        """
+        Returns the optimal plan from start_gameweek to the end of the season.
+        chips_available maps chip name -> number of times it can still be played. With per-instance
+        windows the remaining instances are taken to be the latest-ending ones, since earlier
+        windows are the ones that have already been used or expired.
+        """
+        index = next((i for i, gw in enumerate(self._gameweeks) if gw >= start_gameweek), len(self._gameweeks))
+        free_transfers = max(1, min(free_transfers, self.max_free_transfers))
+        chips = tuple(self._chip_instances(chip, chips_available.get(chip, 0)) for chip in CHIPS)
+
+        total, _ = self._best(index, free_transfers, chips)
+
+        gameweeks = []
+        while index < len(self._gameweeks):
+            _, decision = self._best(index, free_transfers, chips)
+            chip, transfers, points, next_free_transfers = decision
+            gameweeks.append({
+                "gameweek": self._gameweeks[index],
+                "chip": chip,
+                "transfers": transfers,
+                "free_transfers": free_transfers,
+                "hit": max(0, transfers - free_transfers) * self.hit_cost if transfers is not None else 0,
+                "expected_points": round(points, 2)
+            })
+            if chip:
+                chips = self._use_chip(chips, chip, self._playable_instance(chip, chips, self._gameweeks[index]))
+            free_transfers = next_free_transfers
+            index += 1
+
+        return {"expected_points": round(total, 2), "gameweeks": gameweeks}
+
+    def _chip_instances(self, chip, count):
+        """The windows of the chip's remaining instances, earliest-ending first."""
+        windows = self.chip_windows.get(chip, (None, None))
+        if not isinstance(windows, list):
+            return (windows,) * count
+        remaining = windows[max(0, len(windows) - count):]
+        # Instances beyond the listed windows can be played at any time
+        return tuple(sorted([(None, None)] * (count - len(remaining)) + remaining, key=_window_end))
+
+    def _use_chip(self, chips, chip, instance):
+        position = CHIPS.index(chip)
+        remaining = chips[position][:instance] + chips[position][instance + 1:]
+        return chips[:position] + (remaining,) + chips[position + 1:]
+
+    def _playable_instance(self, chip, chips, gameweek):
+        """Index of the instance to play in gameweek (the open window that closes first), or None."""
+        for instance, (first_gw, last_gw) in enumerate(chips[CHIPS.index(chip)]):
+            if (first_gw is None or gameweek >= first_gw) and (last_gw is None or gameweek <= last_gw):
+                return instance
+        return None
+
+    def _best(self, index, free_transfers, chips):
+        """
+        Best (expected points, decision) from gameweek index onwards. The decision is
+        (chip, transfers, points, next free transfers); transfers is None under a wildcard or free hit.
+        """
+        if index >= len(self._gameweeks):
+            return 0.0, None
+        key = (index, free_transfers, chips)
+        if key in self._memo:
+            return self._memo[key]
+
+        gameweek = self._gameweeks[index]
+        estimate = self.estimates[gameweek]
+        base = estimate.get('base', 0.0)
+        chip_gains = estimate.get('chip_gains', {})
+
+        cumulative_gains = [0.0]
+        for gain in estimate.get('transfer_gains', []):
+            cumulative_gains.append(cumulative_gains[-1] + gain)
+
+        best_value, best_decision = None, None
+
+        # Not playing a chip is tried first so that ties keep the chip for later
+        for chip in (None, "bboost", "3xc"):
+            instance = self._playable_instance(chip, chips, gameweek) if chip else None
+            if chip and instance is None:
+                continue
+            remaining_chips = self._use_chip(chips, chip, instance) if chip else chips
+            chip_gain = chip_gains.get(chip, 0.0) if chip else 0.0
+            for transfers, gain in enumerate(cumulative_gains):
+                points = base + gain + chip_gain - max(0, transfers - free_transfers) * self.hit_cost
+                next_free_transfers = min(self.max_free_transfers, max(0, free_transfers - transfers) + 1)
+                future, _ = self._best(index + 1, next_free_transfers, remaining_chips)
+                if best_value is None or points + future > best_value:
+                    best_value, best_decision = points + future, (chip, transfers, points, next_free_transfers)
+
+        for chip in TRANSFER_CHIPS:
+            instance = self._playable_instance(chip, chips, gameweek)
+            if instance is None:
+                continue
+            points = base + chip_gains.get(chip, 0.0)
+            # Banked free transfers are kept through a wildcard or free hit
+            next_free_transfers = min(self.max_free_transfers, free_transfers + 1)
+            future, _ = self._best(index + 1, next_free_transfers, self._use_chip(chips, chip, instance))
+            if points + future > best_value:
+                best_value, best_decision = points + future, (chip, None, points, next_free_transfers)
+
+        self._memo[key] = (best_value, best_decision)
+        return self._memo[key]
+
+def plan_season(estimates, start_gameweek, free_transfers, chips_available, **options):
+    """Convenience wrapper for a one-off plan; keep a SeasonPlanner to re-plan incrementally."""
+    return SeasonPlanner(estimates, **options).plan(start_gameweek, free_transfers, chips_available)